@@ -1,4 +1,5 @@
 import streamlit as st
+import io
 import os
 import sys
 from PIL import Image
@@ -12,6 +13,13 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 from src.model_loader import ModelLoader
 from src.vector_indexer import Indexer
 from src.ranker import Ranker
+from src.local_store import LocalVectorStore
+from src.neighbours import NeighbourSearch
+from src.attribute_index import AttributeIndex
+from src.dedup import collapse_duplicates
+from src.utils import load_metadata
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
 # Page Config
 st.set_page_config(
@@ -46,7 +54,80 @@ st.markdown("""
 
 @st.cache_resource
 def load_components():
-    return ModelLoader(), Indexer(), Ranker()
+    indexer = Indexer()
+    neighbours = NeighbourSearch(
+        indexer,
+        store=LocalVectorStore(DATA_DIR, mmap=True),
+        cache_path=os.path.join(DATA_DIR, 'neighbours.json'),
+        metadata=load_metadata(os.path.join(DATA_DIR, 'metadata.json'))
+    )
+    return ModelLoader(), indexer, Ranker(), neighbours
+
+@st.cache_resource
+def load_attributes():
+    """Load the attribute index used for filtered search."""
+    return AttributeIndex.load(DATA_DIR)
+
+@st.cache_data(show_spinner=False)
+def encode_uploads(_model_loader, upload_bytes):
+    """
+    Encode uploaded images into one query vector, cached by file contents.
+    
+    Streamlit reruns the script on every widget change; caching keeps those reruns
+    from pushing the same uploads through the image tower again.
+    """
+    return NeighbourSearch.encode_images([io.BytesIO(b) for b in upload_bytes], _model_loader)
+
+def sidebar_filters(attributes):
+    """Render the filter controls and return them as a filter dict (empty when unfiltered)."""
+    st.sidebar.header("Filters")
+    filters = {}
+    
+    min_width = st.sidebar.number_input("Minimum width (px)", min_value=0, value=0, step=100)
+    if min_width:
+        filters['photo_width'] = {'$gte': min_width}
+        
+    orientation = st.sidebar.selectbox("Orientation", ["Any", "Landscape", "Portrait", "Square"])
+    if orientation == "Landscape":
+        filters['photo_aspect_ratio'] = {'$gt': 1.05}
+    elif orientation == "Portrait":
+        filters['photo_aspect_ratio'] = {'$lt': 0.95}
+    elif orientation == "Square":
+        filters['photo_aspect_ratio'] = {'$gte': 0.95, '$lte': 1.05}
+        
+    countries = st.sidebar.multiselect("Country", attributes.values('photo_location_country'))
+    if countries:
+        filters['photo_location_country'] = {'$in': countries}
+        
+    photographer = st.sidebar.text_input("Photographer username").strip()
+    if photographer:
+        filters['photographer_username'] = photographer
+        
+    submitted_after = st.sidebar.date_input("Submitted after", value=None)
+    if submitted_after:
+        filters['photo_submitted_at'] = {'$gte': submitted_after.isoformat()}
+        
+    return filters
+
+def display_results(results):
+    """Display results in a grid with a 'More like this' button per image."""
+    cols = st.columns(3)
+    for idx, match in enumerate(results):
+        meta = match['metadata']
+        score = match['score']
+        
+        # Resolve image path
+        img_path = os.path.join(os.path.dirname(__file__), meta['path'])
+        
+        with cols[idx % 3]:
+            if os.path.exists(img_path):
+                image = Image.open(img_path)
+                st.image(image, width="stretch", caption=f"Score: {score:.2f}")
+            else:
+                st.warning(f"Image not found: {meta['path']}")
+            if st.button("More like this", key=f"similar-{match['id']}"):
+                st.session_state['similar_to'] = match['id']
+                st.rerun()
 
 def main():
     st.title("🔍 Vision Scout")
@@ -54,7 +135,7 @@ def main():
     
     # Load components
     try:
-        model_loader, indexer, ranker = load_components()
+        model_loader, indexer, ranker, neighbours = load_components()
     except Exception as e:
         st.error(f"Error loading components: {e}")
         st.stop()
@@ -78,9 +159,47 @@ def main():
         return desc_map
 
     desc_map = load_descriptions()
+    
+    # Filters need the attribute index built at ingest time, aligned with the local store
+    attributes = load_attributes()
+    cluster_of = neighbours.cluster_of
+    store = neighbours.store
+    filters = {}
+    if attributes is not None and attributes.ids == store.ids:
+        filters = sidebar_filters(attributes)
+    else:
+        st.sidebar.info("Filters unavailable: run scripts/ingest_and_index.py to build the attribute index.")
+    # The same pre-filter mask applies to text, "more like this" and uploaded-image search
+    mask = attributes.mask(filters) if filters else None
+        
+    # "More like this" reuses the stored vector of an indexed image: one vector search, no encoding
+    similar_to = st.session_state.get('similar_to')
+    if similar_to:
+        if st.button("Back to search"):
+            del st.session_state['similar_to']
+            st.rerun()
+        with st.spinner("Finding similar images..."):
+            similar = neighbours.more_like_this(similar_to, top_k=12, mask=mask)
+        if similar:
+            st.markdown(f"Found **{len(similar)}** images similar to the selected one")
+            display_results(similar)
+        else:
+            st.info("No similar images found.")
+        return
         
     # Search Bar
     query = st.text_input("Describe what you're looking for...", placeholder="e.g., 'a futuristic city at night' or 'a happy dog running'")
+    uploads = st.file_uploader("...or search with your own images", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+    
+    if uploads and not query:
+        with st.spinner("Searching..."):
+            upload_vector = encode_uploads(model_loader, tuple(u.getvalue() for u in uploads))
+            matches = neighbours.search_by_vector(upload_vector, top_k=12, mask=mask) if upload_vector else []
+        if matches:
+            st.markdown(f"Found **{len(matches)}** matches for the uploaded image(s)")
+            display_results(matches)
+        else:
+            st.info("No matches found.")
     
     if query:
         with st.spinner("Searching..."):
@@ -88,13 +207,13 @@ def main():
             text_embedding = model_loader.get_text_embedding(query)
             
             if text_embedding:
-                # Search Pinecone (Fetch top 50 for re-ranking)
-                results = indexer.search(text_embedding, top_k=50)
+                # Search (Fetch top 50 for re-ranking), pre-filtered locally when filters are set
+                matches = neighbours.search(text_embedding, top_k=50, mask=mask)
                 
-                if results and results['matches']:
+                if matches:
                     # Prepare candidates for re-ranking
                     candidates = []
-                    for match in results['matches']:
+                    for match in matches:
                         filename = match['metadata'].get('filename', '')
                         pid = os.path.splitext(filename)[0]
                         description = desc_map.get(pid, "")
@@ -106,26 +225,15 @@ def main():
                             'original_score': match['score']
                         })
                     
+                    # Keep one image per near-duplicate cluster so re-ranking isn't spent on duplicates
+                    candidates = collapse_duplicates(candidates, cluster_of)
+                    
                     # Re-rank
                     ranked_results = ranker.rank(query, candidates, top_k=12)
                     
-                    st.markdown(f"Found **{len(ranked_results)}** matches for *'{query}'* (Re-ranked from top 50)")
+                    st.markdown(f"Found **{len(ranked_results)}** matches for *'{query}'* (Re-ranked {len(candidates)} distinct images from the top {len(matches)})")
                     
-                    # Display results in a grid
-                    cols = st.columns(3)
-                    for idx, match in enumerate(ranked_results):
-                        meta = match['metadata']
-                        score = match['score']
-                        
-                        # Resolve image path
-                        img_path = os.path.join(os.path.dirname(__file__), meta['path'])
-                        
-                        with cols[idx % 3]:
-                            if os.path.exists(img_path):
-                                image = Image.open(img_path)
-                                st.image(image, width="stretch", caption=f"Score: {score:.2f}")
-                            else:
-                                st.warning(f"Image not found: {meta['path']}")
+                    display_results(ranked_results)
                 else:
                     st.info("No matches found.")
             else:
@@ -1,8 +1,12 @@
 import os
 import sys
 import csv
+import json
+import time
 import random
 import hashlib
+import argparse
+import numpy as np
 from tqdm import tqdm
 from dotenv import load_dotenv
 
@@ -14,24 +18,22 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.model_loader import ModelLoader
 from src.vector_indexer import Indexer
 from src.ranker import Ranker
+from src.dedup import collapse_duplicates
+from src.neighbours import corpus_version
+from src.utils import load_metadata
 
-def evaluate(sample_size=100):
-    # Configuration
-    assets_dir = os.path.join(os.path.dirname(__file__), '../assets/image-dataset')
-    csv_path = os.path.join(os.path.dirname(__file__), '../assets/unsplash-research-dataset-lite-latest/photos.csv000')
-    
-    if not os.path.exists(csv_path):
-        print(f"Error: CSV file not found at {csv_path}")
-        return
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '../assets/image-dataset')
+CSV_PATH = os.path.join(os.path.dirname(__file__), '../assets/unsplash-research-dataset-lite-latest/photos.csv000')
+METADATA_PATH = os.path.join(os.path.dirname(__file__), '../data/metadata.json')
+EMBEDDING_IDS_PATH = os.path.join(os.path.dirname(__file__), '../data/embedding_ids.json')
 
-    print("Initializing components...")
-    model_loader = ModelLoader()
-    indexer = Indexer()
-    print("Loading Ranker...")
-    ranker = Ranker()
-    
-    print(f"Reading metadata from {csv_path}...")
+def load_valid_rows(csv_path, assets_dir):
+    """
+    Read the photos TSV and keep the rows whose image is downloaded and which have a description.
     
+    Returns:
+        list: CSV rows (dicts) with an extra 'used_description' key.
+    """
     # Filter for available images
     print("Filtering for available images...")
     available_ids = set()
@@ -43,7 +45,7 @@ def evaluate(sample_size=100):
     
     if not available_ids:
         print("No images found in assets directory.")
-        return
+        return []
 
     # Read CSV and filter
     valid_rows = []
@@ -62,96 +64,281 @@ def evaluate(sample_size=100):
                         valid_rows.append(row)
     except Exception as e:
         print(f"Error reading CSV: {e}")
-        return
+        return []
+        
+    return valid_rows
+
+def target_id(photo_id, assets_dir):
+    """Vector ID of a photo, as assigned by ingest_and_index.py."""
+    filename = f"{photo_id}.jpg"
+    if not os.path.exists(os.path.join(assets_dir, filename)):
+         for f in os.listdir(assets_dir):
+             if f.startswith(photo_id):
+                 filename = f
+                 break
+    
+    rel_path = os.path.join('assets/image-dataset', filename)
+    return hashlib.md5(rel_path.encode()).hexdigest()
+
+def rank_of(target, ids, cluster_of=None):
+    """
+    1-based rank of target in ids, or -1 if absent.
+    
+    With cluster_of (vector ID -> cluster ID), any member of the target's
+    near-duplicate cluster counts as a hit, matching the collapsed app results.
+    """
+    cluster_of = cluster_of or {}
+    target = cluster_of.get(target, target)
+    for i, vid in enumerate(ids):
+        if cluster_of.get(vid, vid) == target:
+            return i + 1
+    return -1
+
+def compute_metrics(ranks, sample_size, ks=(1, 5, 10)):
+    """
+    Compute Recall@k and MRR from the ranks of the target images.
+    
+    Args:
+        ranks (list): 1-based rank of the target per query, -1 when not retrieved.
+        sample_size (int): Number of queries (failed queries count as misses).
+        ks (tuple): Cut-offs to report recall at.
+        
+    Returns:
+        dict: Metric name -> value.
+    """
+    metrics = {f"Recall@{k}": sum(1 for r in ranks if 0 < r <= k) / sample_size for k in ks}
+    metrics["MRR"] = sum(1.0 / r for r in ranks if r > 0) / sample_size
+    return metrics
 
+def print_metrics(metrics, sample_size):
+    print("\n--- Evaluation Results ---")
+    print(f"Sample Size: {sample_size}")
+    for name, value in metrics.items():
+        print(f"{name + ':':<11}{value:.4f}")
+    print("--------------------------")
+
+class StageTimer:
+    """Collects wall-clock time per evaluation stage."""
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, fn, cached=False):
+        start = time.perf_counter()
+        result = fn()
+        self.stages.append((name + (" (cached)" if cached else ""), time.perf_counter() - start))
+        return result
+
+    def report(self):
+        print("\n--- Stage Timings ---")
+        for name, seconds in self.stages:
+            print(f"{name + ':':<32}{seconds:8.2f}s")
+        print("---------------------")
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _write_json(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+def corpus_fingerprint(cluster_of):
+    """
+    Version of the ingested corpus, as NeighbourSearch.corpus_version computes it.
+    
+    Uses the local store's ID list, or the metadata IDs when there is no local store.
+    """
+    if os.path.exists(EMBEDDING_IDS_PATH):
+        ids = _read_json(EMBEDDING_IDS_PATH)
+    else:
+        ids = sorted(load_metadata(METADATA_PATH))
+    return corpus_version(ids, cluster_of)
+
+def sample_queries(sample_size, seed):
+    """
+    Materialize a seeded query set: one description query per sampled image.
+    
+    Returns:
+        tuple: (queries, desc_lookup). Queries are dicts with 'photo_id', 'text' and
+               'target' (the expected vector ID); desc_lookup maps photo IDs to descriptions.
+    """
+    print(f"Reading metadata from {CSV_PATH}...")
+    valid_rows = load_valid_rows(CSV_PATH, ASSETS_DIR)
     if not valid_rows:
         print("No matching images found in CSV with descriptions.")
-        return
+        return [], {}
         
     print(f"Found {len(valid_rows)} available images with descriptions for evaluation.")
     
-    # Select random sample
+    # Select a seeded random sample so runs are comparable
     sample_size = min(len(valid_rows), sample_size)
-    print(f"Selecting random sample of {sample_size} images...")
-    sample_rows = random.sample(valid_rows, sample_size)
-    
-    # Metrics
-    recall_at_1 = 0
-    recall_at_5 = 0
-    recall_at_10 = 0
-    mrr_sum = 0
+    print(f"Selecting random sample of {sample_size} images (seed {seed})...")
+    sample_rows = random.Random(seed).sample(valid_rows, sample_size)
     
-    # Build a lookup dictionary for descriptions
     # The initial read filtered for available images, so no need to read the CSV again.
     desc_lookup = {row['photo_id']: row['used_description'] for row in valid_rows}
+    
+    queries = [{
+        'photo_id': row['photo_id'],
+        'text': row['used_description'],
+        'target': target_id(row['photo_id'], ASSETS_DIR)
+    } for row in sample_rows]
+    return queries, desc_lookup
 
-    for row in tqdm(sample_rows):
-        photo_id = row['photo_id']
-        query_text = row['used_description']
-            
-        # Generate embedding for the query
-        text_embedding = model_loader.get_text_embedding(query_text)
-        
-        if not text_embedding:
-            continue
-            
-        # Search Pinecone (Fetch top 50 for re-ranking)
-        results = indexer.search(text_embedding, top_k=100)
-        
+def encode_queries(queries, model_loader):
+    """Text embeddings of the queries, as a float32 matrix (NaN rows where encoding failed)."""
+    embeddings = [model_loader.get_text_embedding(query['text']) for query in tqdm(queries, desc="Encoding")]
+    dimension = next((len(e) for e in embeddings if e), 0)
+    return np.asarray([e if e else [np.nan] * dimension for e in embeddings], dtype=np.float32)
+
+def retrieve_candidates(queries, vectors, indexer, desc_lookup, retrieve_k):
+    """Top retrieve_k candidates per query, with the descriptions the re-ranker needs."""
+    all_candidates = []
+    for vector in tqdm(vectors, desc="Retrieving"):
         candidates = []
-        if results and results['matches']:
-            for match in results['matches']:
-                filename = match['metadata'].get('filename', '')
-                pid = os.path.splitext(filename)[0]
-                
-                # Get description
-                description = desc_lookup.get(pid, "")
-                
-                candidates.append({
-                    'id': match['id'],
-                    'text': description,
-                    'metadata': match['metadata'],
-                    'original_score': match['score']
-                })
-        
-        # Re-rank
-        ranked_results = ranker.rank(query_text, candidates, top_k=10)
-        
-        # Determine target ID
-        filename = f"{photo_id}.jpg"
-        if not os.path.exists(os.path.join(assets_dir, filename)):
-             for f in os.listdir(assets_dir):
-                 if f.startswith(photo_id):
-                     filename = f
-                     break
-        
-        rel_path = os.path.join('assets/image-dataset', filename)
-        target_id = hashlib.md5(rel_path.encode()).hexdigest()
-        
-        rank = -1
-        # Check in ranked_results
-        for i, match in enumerate(ranked_results):
-            if match['id'] == target_id:
-                rank = i + 1
-                break
+        if not np.isnan(vector).any():
+            # Search Pinecone (Fetch top retrieve_k for re-ranking)
+            results = indexer.search(vector.tolist(), top_k=retrieve_k)
+            if results and results['matches']:
+                for match in results['matches']:
+                    filename = match['metadata'].get('filename', '')
+                    pid = os.path.splitext(filename)[0]
+                    
+                    candidates.append({
+                        'id': match['id'],
+                        'text': desc_lookup.get(pid, ""),
+                        'metadata': dict(match['metadata']),
+                        'original_score': float(match['score'])
+                    })
+        all_candidates.append(candidates)
+    return all_candidates
+
+def rerank(queries, all_candidates, ranker, top_k, cluster_of):
+    """
+    Collapse near-duplicates, re-rank every candidate list and return the rank of each query's target.
+    
+    Mirrors the app pipeline: one candidate per cluster reaches the re-ranker, and
+    the target counts as found when its cluster's surviving member is returned.
+    """
+    ranks = []
+    for query, candidates in tqdm(list(zip(queries, all_candidates)), desc="Re-ranking"):
+        # Ranker.rank annotates candidates in place, so hand it copies of the cached lists
+        candidates = collapse_duplicates([dict(c) for c in candidates], cluster_of)
+        ranked_results = ranker.rank(query['text'], candidates, top_k=top_k)
+        ranks.append(rank_of(query['target'], [match['id'] for match in ranked_results], cluster_of))
+    return ranks
+
+def evaluate(sample_size=100, seed=0, cache_dir=None, retrieve_k=100, top_k=10,
+             reranker_model="cross-encoder/ms-marco-MiniLM-L-6-v2", refresh=False, collapse=True):
+    """
+    Evaluate retrieval + re-ranking with Recall@k and MRR.
+    
+    With a cache_dir, the seeded query set, the query vectors and the top
+    retrieve_k candidate lists are cached on disk, so later runs (e.g. comparing
+    re-rankers or top_k) only re-run the re-ranking stage. Candidate lists are
+    tagged with the corpus fingerprint and retrieved again after a re-ingest.
+    
+    Args:
+        sample_size (int): Number of description queries.
+        seed (int): Seed for the query sample.
+        cache_dir (str): Directory for cached stages, or None to run everything.
+        retrieve_k (int): Candidates retrieved per query for re-ranking.
+        top_k (int): Results kept after re-ranking.
+        reranker_model (str): Cross-Encoder model used by the Ranker.
+        refresh (bool): Recompute and overwrite cached stages.
+        collapse (bool): Collapse near-duplicates and count any member of the target's
+                         cluster as a hit. False scores the exact target image only.
+    """
+    if not os.path.exists(CSV_PATH):
+        print(f"Error: CSV file not found at {CSV_PATH}")
+        return
+
+    timer = StageTimer()
+    paths = {}
+    if cache_dir:
+        run_dir = os.path.join(cache_dir, f"seed{seed}_n{sample_size}")
+        os.makedirs(run_dir, exist_ok=True)
+        paths = {
+            'queries': os.path.join(run_dir, 'queries.json'),
+            'vectors': os.path.join(run_dir, 'query_vectors.npy'),
+            'candidates': os.path.join(run_dir, f'candidates_top{retrieve_k}.json'),
+        }
         
-        if rank > 0:
-            mrr_sum += 1.0 / rank
-            if rank <= 1:
-                recall_at_1 += 1
-            if rank <= 5:
-                recall_at_5 += 1
-            if rank <= 10:
-                recall_at_10 += 1
+    # Once a stage is recomputed, every later stage is recomputed too
+    stale = refresh or not paths
+    
+    # 1. Query set
+    desc_lookup = None
+    if not stale and os.path.exists(paths['queries']):
+        queries = timer.run("Query sampling", lambda: _read_json(paths['queries']), cached=True)
+    else:
+        queries, desc_lookup = timer.run("Query sampling", lambda: sample_queries(sample_size, seed))
+        if not queries:
+            return
+        if paths:
+            _write_json(queries, paths['queries'])
+        stale = True
+    
+    # 2. Query vectors
+    if not stale and os.path.exists(paths['vectors']):
+        vectors = timer.run("Query encoding", lambda: np.load(paths['vectors']), cached=True)
+    else:
+        print("Initializing model...")
+        model_loader = ModelLoader()
+        vectors = timer.run("Query encoding", lambda: encode_queries(queries, model_loader))
+        if paths:
+            np.save(paths['vectors'], vectors)
+        stale = True
+    
+    # Near-duplicate clusters come from the local metadata written at ingest
+    metadata = load_metadata(METADATA_PATH)
+    cluster_of = {vid: meta['cluster_id'] for vid, meta in metadata.items() if 'cluster_id' in meta}
+    corpus = corpus_fingerprint(cluster_of)
+    
+    # 3. Candidate retrieval (cached lists from a different corpus are stale)
+    cached = None
+    if not stale and os.path.exists(paths['candidates']):
+        cached = _read_json(paths['candidates'])
+        if not isinstance(cached, dict) or cached.get('corpus') != corpus:
+            print("Corpus changed since the candidates were cached, retrieving again...")
+            cached = None
+    if cached is not None:
+        all_candidates = timer.run(f"Retrieval (top {retrieve_k})", lambda: cached['candidates'], cached=True)
+    else:
+        if desc_lookup is None:
+            desc_lookup = {row['photo_id']: row['used_description'] for row in load_valid_rows(CSV_PATH, ASSETS_DIR)}
+        print("Initializing indexer...")
+        indexer = Indexer()
+        all_candidates = timer.run(f"Retrieval (top {retrieve_k})",
+                                   lambda: retrieve_candidates(queries, vectors, indexer, desc_lookup, retrieve_k))
+        if paths:
+            _write_json({'corpus': corpus, 'candidates': all_candidates}, paths['candidates'])
+    
+    # 4. Re-ranking
+    print("Loading Ranker...")
+    ranker = Ranker(reranker_model)
+    ranks = timer.run(f"Re-ranking (top {top_k})",
+                      lambda: rerank(queries, all_candidates, ranker, top_k, cluster_of if collapse else {}))
                 
     # Calculate final metrics
-    print("\n--- Evaluation Results ---")
-    print(f"Sample Size: {sample_size}")
-    print(f"Recall@1:  {recall_at_1 / sample_size:.4f}")
-    print(f"Recall@5:  {recall_at_5 / sample_size:.4f}")
-    print(f"Recall@10: {recall_at_10 / sample_size:.4f}")
-    print(f"MRR:       {mrr_sum / sample_size:.4f}")
-    print("--------------------------")
+    ks = tuple(k for k in (1, 5, 10) if k < top_k) + (top_k,)
+    print(f"\nNear-duplicates: {'collapsed, any cluster member counts as a hit' if collapse else 'not collapsed, exact target only'}")
+    print_metrics(compute_metrics(ranks, len(queries), ks), len(queries))
+    timer.report()
 
 if __name__ == "__main__":
-    evaluate()
+    parser = argparse.ArgumentParser(description="Evaluate retrieval and re-ranking on Unsplash descriptions.")
+    parser.add_argument("--sample_size", type=int, default=100, help="Number of description queries.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the query sample.")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="Cache the query set, query vectors and candidates here (e.g. data/eval_cache) so later runs only re-rank.")
+    parser.add_argument("--retrieve_k", type=int, default=100, help="Candidates retrieved per query.")
+    parser.add_argument("--top_k", type=int, default=10, help="Results kept after re-ranking.")
+    parser.add_argument("--reranker", type=str, default="cross-encoder/ms-marco-MiniLM-L-6-v2", help="Cross-Encoder model for re-ranking.")
+    parser.add_argument("--refresh", action="store_true", help="Recompute cached stages.")
+    parser.add_argument("--no_collapse", action="store_true",
+                        help="Do not collapse near-duplicates; only the exact target image counts as a hit.")
+    
+    args = parser.parse_args()
+    evaluate(args.sample_size, args.seed, args.cache_dir, args.retrieve_k, args.top_k, args.reranker, args.refresh,
+             collapse=not args.no_collapse)
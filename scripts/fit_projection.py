@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.local_store import LocalVectorStore
+from src.projection import PCAProjection
+
+def main(n_components=256, sample_size=20000):
+    data_dir = os.path.join(os.path.dirname(__file__), '../data')
+    store = LocalVectorStore(data_dir)
+    if not len(store):
+        print("No local embeddings found. Run ingest_and_index.py first.")
+        return
+
+    print(f"Fitting PCA to {n_components} dims on {min(len(store), sample_size)} of {len(store)} embeddings...")
+    projection = PCAProjection.fit(store.embeddings, n_components, sample_size)
+    projection.save(data_dir)
+    store.set_projection(projection)
+    store.save_reduced()
+    print(f"Saved projection to {os.path.join(data_dir, 'projection.npz')} and reduced vectors to {store.reduced_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit a PCA projection on the ingested embeddings for first-pass search.")
+    parser.add_argument("--dims", type=int, default=256, help="Number of PCA components to keep.")
+    parser.add_argument("--sample_size", type=int, default=20000, help="Maximum number of embeddings used for the fit.")
+
+    args = parser.parse_args()
+    main(args.dims, args.sample_size)
@@ -12,14 +12,17 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.model_loader import ModelLoader
 from src.vector_indexer import Indexer
-from src.utils import get_image_paths, save_metadata, save_embeddings
+from src.local_store import LocalVectorStore
+from src.attribute_index import AttributeIndex
+from src.dedup import cluster_near_duplicates
+from src.utils import get_image_paths, save_metadata, vector_values
 
 def main():
     # Configuration
     assets_dir = os.path.join(os.path.dirname(__file__), '../assets/image-dataset')
     data_dir = os.path.join(os.path.dirname(__file__), '../data')
     metadata_path = os.path.join(data_dir, 'metadata.json')
-    embeddings_path = os.path.join(data_dir, 'embeddings.npy')
+    csv_path = os.path.join(os.path.dirname(__file__), '../assets/unsplash-research-dataset-lite-latest/photos.csv000')
     
     # Ensure data directory exists
     os.makedirs(data_dir, exist_ok=True)
@@ -28,6 +31,7 @@ def main():
     print("Initializing components...")
     model_loader = ModelLoader()
     indexer = Indexer()
+    store = LocalVectorStore(data_dir)
     
     # Get image paths
     print(f"Scanning {assets_dir} for images...")
@@ -40,55 +44,39 @@ def main():
     
     # Process images
     metadata = {}
-    batch_size = 100
-    current_batch = []
+    chunk_size = 1000
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     
-    print(f"Generating embeddings and upserting in batches of {batch_size}...")
+    # 1. Generate Deterministic IDs, based on relative path
+    path_map = {} # Map ID to (path, rel_path)
+    for img_path in image_paths:
+        rel_path = os.path.relpath(img_path, project_root)
+        img_id = hashlib.md5(rel_path.encode()).hexdigest()
+        path_map[img_id] = (img_path, rel_path)
     
-    # Pre-calculate Deterministic IDs and check existence in chunks
-    total_skipped = 0
+    # 2. Check which IDs already exist in Pinecone, in one concurrent fetch over the whole set
+    print("Checking which images are already indexed...")
+    existing = indexer.fetch_vectors(list(path_map)).get('vectors', {})
+    
+    # Keep a local copy of vectors already in Pinecone so they can be reused without re-encoding
+    store.add([(vid, vector_values(vec)) for vid, vec in existing.items() if vid not in store])
+    
+    # 3. Filter out existing ones
+    to_process_ids = [img_id for img_id in path_map if img_id not in existing]
+    total_skipped = len(path_map) - len(to_process_ids)
     total_processed = 0
+    if total_skipped > 0:
+        print(f"Skipping {total_skipped} images already in index...")
     
-    # Process in chunks of batch_size
-    for i in range(0, len(image_paths), batch_size):
-        batch_paths = image_paths[i:i + batch_size]
-        
-        # 1. Generate Deterministic IDs for this batch, based on relative path
-        batch_ids = []
-        path_map = {} # Map ID to (path, rel_path)
-        
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        
-        for img_path in batch_paths:
-            rel_path = os.path.relpath(img_path, project_root)
-            
-            img_id = hashlib.md5(rel_path.encode()).hexdigest()
-            batch_ids.append(img_id)
-            path_map[img_id] = (img_path, rel_path)
-            
-        # 2. Check which IDs already exist in Pinecone
-        existing_vectors = indexer.fetch_vectors(batch_ids)
-        existing_ids = set(existing_vectors.get('vectors', {}).keys())
-        
-        # 3. Filter out existing ones
-        to_process_ids = [bid for bid in batch_ids if bid not in existing_ids]
-        skipped_count = len(batch_ids) - len(to_process_ids)
-        total_skipped += skipped_count
-        
-        if skipped_count > 0:
-            print(f"Skipping {skipped_count} images already in index...")
-            
-        if not to_process_ids:
-            continue
-            
-        # 4. Process only the missing ones
+    # 4. Encode the missing ones and upsert them in large chunks, so every upsert call keeps the worker pool busy
+    print(f"Generating embeddings and upserting in chunks of {chunk_size}...")
+    for i in tqdm(range(0, len(to_process_ids), chunk_size), desc="Ingesting", unit="chunk"):
+        chunk_ids = to_process_ids[i:i + chunk_size]
         current_batch = []
-        for img_id in to_process_ids:
+        embeddings = model_loader.get_image_embeddings([path_map[img_id][0] for img_id in chunk_ids])
+        for img_id, embedding in zip(chunk_ids, embeddings):
             img_path, rel_path = path_map[img_id]
             
-            # Get embedding
-            embedding = model_loader.get_image_embedding(img_path)
-            
             if embedding:
                 meta = {
                     "path": rel_path,
@@ -101,6 +89,7 @@ def main():
         # 5. Upsert the new vectors
         if current_batch:
             indexer.upsert_vectors(current_batch)
+            store.add([(img_id, embedding) for img_id, embedding, _ in current_batch])
 
     print(f"Processing complete. Processed: {total_processed}, Skipped: {total_skipped}")
     
@@ -115,8 +104,25 @@ def main():
         except Exception as e:
             print(f"Warning: Could not merge with existing metadata: {e}")
             
+    # Tag near-duplicates with a shared cluster ID (the ID of the cluster's first vector) so search can collapse them
+    print("Clustering near-duplicate images...")
+    clusters = cluster_near_duplicates(store.embeddings)
+    for img_id, cluster in zip(store.ids, clusters):
+        if img_id in metadata:
+            metadata[img_id]['cluster_id'] = store.ids[cluster]
+    print(f"Found {len(set(clusters.tolist()))} distinct images among {len(store)} vectors.")
+            
     print("Saving local metadata...")
     save_metadata(metadata, metadata_path)
+    print(f"Saving local vector store ({len(store)} vectors)...")
+    store.save()
+    
+    # Compile the TSV attributes into a columnar index aligned with the local store, for pre-filtered search
+    if os.path.exists(csv_path):
+        print("Building attribute index...")
+        AttributeIndex.build(store.ids, metadata, csv_path).save(data_dir)
+    else:
+        print(f"Warning: CSV file not found at {csv_path}, skipping attribute index.")
     print("Ingestion complete!")
 
 
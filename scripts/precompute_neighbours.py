@@ -0,0 +1,78 @@
+import os
+import sys
+import csv
+import argparse
+from tqdm import tqdm
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_indexer import Indexer
+from src.local_store import LocalVectorStore
+from src.neighbours import NeighbourSearch
+from src.utils import load_metadata
+
+def popular_ids(csv_path, metadata, limit):
+    """
+    Pick the most downloaded ingested images.
+
+    Args:
+        csv_path (str): Path to the photos.csv000 file.
+        metadata (dict): Ingested metadata keyed by vector ID.
+        limit (int): Number of IDs to return.
+
+    Returns:
+        list: Vector IDs ordered by download count, most popular first.
+    """
+    id_by_photo = {os.path.splitext(meta['filename'])[0]: vid for vid, meta in metadata.items()}
+
+    downloads = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f, delimiter='\t')
+        for row in reader:
+            vid = id_by_photo.get(row['photo_id'])
+            if vid:
+                downloads.append((int(row.get('stats_downloads') or 0), vid))
+
+    downloads.sort(reverse=True)
+    return [vid for _, vid in downloads[:limit]]
+
+def main(limit=500, top_k=12):
+    data_dir = os.path.join(os.path.dirname(__file__), '../data')
+    csv_path = os.path.join(os.path.dirname(__file__), '../assets/unsplash-research-dataset-lite-latest/photos.csv000')
+
+    if not os.path.exists(csv_path):
+        print(f"Error: CSV file not found at {csv_path}")
+        return
+
+    metadata = load_metadata(os.path.join(data_dir, 'metadata.json'))
+    if not metadata:
+        print("No local metadata found. Run ingest_and_index.py first.")
+        return
+
+    print("Initializing components...")
+    searcher = NeighbourSearch(
+        Indexer(),
+        store=LocalVectorStore(data_dir),
+        cache_path=os.path.join(data_dir, 'neighbours.json'),
+        cache_size=max(limit, 1024),
+        metadata=metadata
+    )
+
+    ids = popular_ids(csv_path, metadata, limit)
+    print(f"Precomputing {top_k} neighbours for {len(ids)} popular images...")
+    searcher.precompute(tqdm(ids), top_k=top_k)
+
+    searcher.save()
+    print(f"Saved neighbour lists to {searcher.cache_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute 'more like this' neighbour lists for popular images.")
+    parser.add_argument("--limit", type=int, default=500, help="Number of popular images to precompute.")
+    parser.add_argument("--top_k", type=int, default=12, help="Number of neighbours per image.")
+
+    args = parser.parse_args()
+    main(args.limit, args.top_k)
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import numpy as np
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_indexer import Indexer
+
+class StandInError(Exception):
+    """Error raised by the stand-in, carrying an HTTP status like Pinecone's ApiError."""
+    def __init__(self, message, status_code):
+        super().__init__(f"[{status_code}] {message}")
+        self.status_code = status_code
+
+class StandInIndex:
+    """
+    In-memory stand-in for a Pinecone index that injects latency, transient
+    failures and payload-size rejections, so Indexer can be exercised offline.
+    """
+    def __init__(self, latency=0.05, failure_rate=0.1, max_request_bytes=2 * 1024 * 1024):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_request_bytes = max_request_bytes
+        self.namespaces = {}
+        self.calls = {'upsert': 0, 'fetch': 0, 'query': 0, 'failed': 0, 'too_large': 0}
+        self._lock = threading.Lock()
+
+    def _request(self, kind):
+        """Simulate network latency and random server failures."""
+        with self._lock:
+            self.calls[kind] += 1
+        time.sleep(random.uniform(0, 2 * self.latency))
+        if random.random() < self.failure_rate:
+            with self._lock:
+                self.calls['failed'] += 1
+            raise StandInError("Service unavailable", random.choice([429, 500, 503]))
+
+    def upsert(self, vectors, namespace=""):
+        payload = len(json.dumps([[v[0], list(v[1]), v[2]] for v in vectors]))
+        if payload > self.max_request_bytes:
+            with self._lock:
+                self.calls['too_large'] += 1
+            raise StandInError(f"Request size {payload} bytes exceeds the maximum supported size", 413)
+        self._request('upsert')
+        with self._lock:
+            store = self.namespaces.setdefault(namespace, {})
+            for vector_id, values, metadata in vectors:
+                store[vector_id] = {'id': vector_id, 'values': list(values), 'metadata': metadata}
+        return {'upserted_count': len(vectors)}
+
+    def fetch(self, ids, namespace=""):
+        self._request('fetch')
+        store = self.namespaces.get(namespace, {})
+        return {'vectors': {vid: store[vid] for vid in ids if vid in store}}
+
+    def query(self, vector, top_k, include_metadata=True, namespace=""):
+        self._request('query')
+        store = self.namespaces.get(namespace, {})
+        if not store:
+            return {'matches': []}
+        ids = list(store)
+        scores = np.asarray([store[vid]['values'] for vid in ids]) @ np.asarray(vector)
+        top = np.argsort(-scores)[:top_k]
+        return {'matches': [{'id': ids[i], 'score': float(scores[i]), 'metadata': store[ids[i]]['metadata']} for i in top]}
+
+def main(num_vectors, dimension, num_shards, max_workers, latency, failure_rate, max_request_bytes):
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(num_vectors, dimension)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    vectors = [(f"vec-{i}", embeddings[i].tolist(), {"filename": f"{i}.jpg"}) for i in range(num_vectors)]
+
+    stand_in = StandInIndex(latency, failure_rate, max_request_bytes)
+    indexer = Indexer(dimension=dimension, max_workers=max_workers, num_shards=num_shards, index=stand_in)
+
+    start = time.perf_counter()
+    indexer.upsert_vectors(vectors)
+    upsert_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fetched = indexer.fetch_vectors([v[0] for v in vectors])['vectors']
+    fetch_time = time.perf_counter() - start
+
+    # Every vector must be retrievable as its own nearest neighbour
+    probes = random.sample(range(num_vectors), min(20, num_vectors))
+    hits = sum(indexer.search(vectors[i][1], top_k=1)['matches'][0]['id'] == vectors[i][0] for i in probes)
+
+    stored = sum(len(ns) for ns in stand_in.namespaces.values())
+    print("\n--- Indexer Stress Test ---")
+    print(f"Vectors:        {num_vectors} x {dimension} over {max(num_shards, 1)} namespace(s)")
+    print(f"Upsert:         {upsert_time:.2f}s, stored {stored}/{num_vectors}")
+    print(f"Fetch:          {fetch_time:.2f}s, fetched {len(fetched)}/{num_vectors}")
+    print(f"Self-queries:   {hits}/{len(probes)} found")
+    print(f"Requests:       {stand_in.calls}")
+    print("---------------------------")
+
+    if stored != num_vectors or len(fetched) != num_vectors or hits != len(probes):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise Indexer against a local stand-in that injects latency and failures.")
+    parser.add_argument("--num_vectors", type=int, default=5000, help="Number of random vectors to upsert.")
+    parser.add_argument("--dimension", type=int, default=1152, help="Vector dimension.")
+    parser.add_argument("--num_shards", type=int, default=1, help="Number of namespaces to shard over.")
+    parser.add_argument("--max_workers", type=int, default=8, help="Concurrent requests.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean injected latency per request, in seconds.")
+    parser.add_argument("--failure_rate", type=float, default=0.1, help="Probability that a request fails transiently.")
+    parser.add_argument("--max_request_bytes", type=int, default=2 * 1024 * 1024, help="Payload limit enforced on upserts.")
+
+    args = parser.parse_args()
+    main(args.num_vectors, args.dimension, args.num_shards, args.max_workers,
+         args.latency, args.failure_rate, args.max_request_bytes)
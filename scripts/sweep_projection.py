@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+from tqdm import tqdm
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.model_loader import ModelLoader
+from src.local_store import LocalVectorStore
+from src.projection import PCAProjection
+from evaluate_model import ASSETS_DIR, CSV_PATH, load_valid_rows, target_id, rank_of, compute_metrics
+
+def run(store, queries, top_k, oversample=4, exact=False):
+    """Search every query and return (ranks of the targets, result IDs, mean latency in ms)."""
+    ranks, results = [], []
+    start = time.perf_counter()
+    for vector, target in queries:
+        ids = [m['id'] for m in store.search(vector, top_k=top_k, oversample=oversample, exact=exact)]
+        results.append(ids)
+        ranks.append(rank_of(target, ids))
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    return ranks, results, latency
+
+def sweep(sample_size=200, seed=0, dims=(512, 256, 128, 64), oversamples=(2, 4, 8), top_k=50):
+    data_dir = os.path.join(os.path.dirname(__file__), '../data')
+    store = LocalVectorStore(data_dir)
+    if not len(store):
+        print("No local embeddings found. Run ingest_and_index.py first.")
+        return
+    store.set_projection(None)
+
+    valid_rows = load_valid_rows(CSV_PATH, ASSETS_DIR)
+    rows = [row for row in valid_rows if target_id(row['photo_id'], ASSETS_DIR) in store]
+    if not rows:
+        print("No evaluation images found in the local store.")
+        return
+
+    rows = random.Random(seed).sample(rows, min(sample_size, len(rows)))
+    print(f"Encoding {len(rows)} queries...")
+    model_loader = ModelLoader()
+    queries = []
+    for row in tqdm(rows):
+        embedding = model_loader.get_text_embedding(row['used_description'])
+        if embedding:
+            queries.append((np.asarray(embedding, dtype=np.float32), target_id(row['photo_id'], ASSETS_DIR)))
+
+    ks = (1, 10, top_k)
+    full_bytes = store.embeddings.nbytes
+    ranks, exact_results, latency = run(store, queries, top_k, exact=True)
+    metrics = compute_metrics(ranks, len(queries), ks)
+
+    header = f"{'Dims':>5} {'Oversample':>10} {'Latency(ms)':>11} {'Memory(MB)':>10} {'Overlap@' + str(top_k):>11}"
+    header += "".join(f" {name:>10}" for name in metrics)
+    print("\n--- Projection Sweep ---")
+    print(f"Queries: {len(queries)}, vectors: {len(store)}, seed: {seed}")
+    print("Memory is the resident first-pass matrix; full vectors are only read for the shortlist when memory-mapped.")
+    print(header)
+
+    def report(dim, oversample, latency, memory, overlap, metrics):
+        line = f"{dim:>5} {oversample:>10} {latency:>11.2f} {memory / 2**20:>10.1f} {overlap:>11.4f}"
+        print(line + "".join(f" {value:>10.4f}" for value in metrics.values()))
+
+    report(store.embeddings.shape[1], "-", latency, full_bytes, 1.0, metrics)
+
+    for dim in dims:
+        store.set_projection(PCAProjection.fit(store.embeddings, dim, seed=seed))
+        for oversample in oversamples:
+            ranks, results, latency = run(store, queries, top_k, oversample=oversample)
+            overlap = np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(results, exact_results)])
+            report(dim, oversample, latency, store.reduced.nbytes, overlap, compute_metrics(ranks, len(queries), ks))
+    print("------------------------")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep PCA dimensions and oversampling for first-pass search.")
+    parser.add_argument("--sample_size", type=int, default=200, help="Number of description queries.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the query sample and the PCA fit.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[512, 256, 128, 64], help="PCA dimensions to try.")
+    parser.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 8], help="Shortlist multiples of top_k to try.")
+    parser.add_argument("--top_k", type=int, default=50, help="Number of results per query (Recall@top_k is reported).")
+
+    args = parser.parse_args()
+    sweep(args.sample_size, args.seed, args.dims, args.oversample, args.top_k)
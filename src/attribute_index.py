@@ -0,0 +1,187 @@
+# Columnar index over the Unsplash photo attributes, used to pre-filter vector search.
+
+import os
+import csv
+from datetime import datetime
+import numpy as np
+
+NUMERIC_COLUMNS = ['photo_width', 'photo_height', 'photo_aspect_ratio', 'photo_submitted_at']
+CATEGORICAL_COLUMNS = [
+    'photographer_username',
+    'photo_location_name',
+    'photo_location_country',
+    'photo_location_city',
+    'photo_featured'
+]
+
+def _to_number(column, value):
+    """Parse a TSV or filter value of a numeric column, NaN when missing or malformed."""
+    if value is None or value == '':
+        return np.nan
+    if column == 'photo_submitted_at':
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return datetime.fromisoformat(str(value)).timestamp()
+        except ValueError:
+            return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class AttributeIndex:
+    def __init__(self, ids, numeric, codes, vocab):
+        """
+        Initialize the index. Use build() or load() rather than calling this directly.
+
+        Args:
+            ids (list): Vector IDs, one per row, in LocalVectorStore order.
+            numeric (dict): Column name -> float array (NaN for missing).
+            codes (dict): Column name -> int32 array of dictionary codes (-1 for missing).
+            vocab (dict): Column name -> list of distinct values, indexed by code.
+        """
+        self.ids = list(ids)
+        self.numeric = numeric
+        self.codes = codes
+        self.vocab = vocab
+        self._lookup = {col: {v: i for i, v in enumerate(values)} for col, values in vocab.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, metadata, csv_path):
+        """
+        Compile the attribute columns for the given vectors from the photos TSV.
+
+        Args:
+            ids (list): Vector IDs in LocalVectorStore order.
+            metadata (dict): Ingested metadata keyed by vector ID (used to map IDs to photo IDs).
+            csv_path (str): Path to the photos.csv000 file.
+
+        Returns:
+            AttributeIndex: The compiled index.
+        """
+        row_by_photo = {}
+        for position, vid in enumerate(ids):
+            meta = metadata.get(vid)
+            if meta:
+                row_by_photo[os.path.splitext(meta['filename'])[0]] = position
+
+        numeric = {col: np.full(len(ids), np.nan, dtype=np.float64) for col in NUMERIC_COLUMNS}
+        codes = {col: np.full(len(ids), -1, dtype=np.int32) for col in CATEGORICAL_COLUMNS}
+        vocab = {col: [] for col in CATEGORICAL_COLUMNS}
+        lookup = {col: {} for col in CATEGORICAL_COLUMNS}
+
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f, delimiter='\t')
+            for row in reader:
+                position = row_by_photo.get(row['photo_id'])
+                if position is None:
+                    continue
+                for col in NUMERIC_COLUMNS:
+                    numeric[col][position] = _to_number(col, row.get(col))
+                for col in CATEGORICAL_COLUMNS:
+                    value = row.get(col)
+                    if not value:
+                        continue
+                    if value not in lookup[col]:
+                        lookup[col][value] = len(vocab[col])
+                        vocab[col].append(value)
+                    codes[col][position] = lookup[col][value]
+
+        return cls(ids, numeric, codes, vocab)
+
+    @classmethod
+    def load(cls, data_dir):
+        """
+        Load the index from data_dir/attributes.npz.
+
+        Returns:
+            AttributeIndex: The index, or None if it has not been built yet.
+        """
+        path = os.path.join(data_dir, 'attributes.npz')
+        if not os.path.exists(path):
+            return None
+
+        data = np.load(path, allow_pickle=True)
+        numeric = {col: data[f'num_{col}'] for col in NUMERIC_COLUMNS}
+        codes = {col: data[f'code_{col}'] for col in CATEGORICAL_COLUMNS}
+        vocab = {col: data[f'vocab_{col}'].tolist() for col in CATEGORICAL_COLUMNS}
+        return cls(data['ids'].tolist(), numeric, codes, vocab)
+
+    def save(self, data_dir):
+        """Persist the index to data_dir/attributes.npz."""
+        arrays = {'ids': np.array(self.ids, dtype=object)}
+        for col in NUMERIC_COLUMNS:
+            arrays[f'num_{col}'] = self.numeric[col]
+        for col in CATEGORICAL_COLUMNS:
+            arrays[f'code_{col}'] = self.codes[col]
+            arrays[f'vocab_{col}'] = np.array(self.vocab[col], dtype=object)
+        np.savez(os.path.join(data_dir, 'attributes.npz'), **arrays)
+
+    def values(self, column):
+        """Distinct values of a categorical column, sorted."""
+        return sorted(self.vocab[column])
+
+    def mask(self, filters):
+        """
+        Compile a filter into a boolean mask over the rows.
+
+        Filters use the Pinecone metadata filter syntax, e.g.
+        {"photo_width": {"$gte": 1920}, "photo_location_country": {"$in": ["Japan", "Iceland"]}}.
+        A bare value is shorthand for {"$eq": value}. Rows with a missing value never match.
+
+        Args:
+            filters (dict): Column name -> value or {operator: operand}.
+
+        Returns:
+            np.ndarray: Boolean array, True where the row is eligible.
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        for column, condition in (filters or {}).items():
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for op, operand in condition.items():
+                mask &= self._column_mask(column, op, operand)
+        return mask
+
+    def _column_mask(self, column, op, operand):
+        """Mask for a single operator applied to one column."""
+        if op in ('$in', '$nin') and not isinstance(operand, (list, tuple)):
+            raise ValueError(f"Operator '{op}' on column '{column}' needs a list or tuple, got {type(operand).__name__}.")
+        if column in self.codes:
+            codes = self.codes[column]
+            lookup = self._lookup[column]
+            if op == '$eq':
+                return codes == lookup.get(operand, -2)
+            if op == '$ne':
+                return (codes >= 0) & (codes != lookup.get(operand, -2))
+            if op in ('$in', '$nin'):
+                wanted = [lookup[v] for v in operand if v in lookup]
+                hits = np.isin(codes, wanted)
+                return hits if op == '$in' else (codes >= 0) & ~hits
+            raise ValueError(f"Unsupported operator '{op}' for categorical column '{column}'.")
+
+        if column in self.numeric:
+            values = self.numeric[column]
+            if op in ('$in', '$nin'):
+                hits = np.isin(values, [_to_number(column, v) for v in operand])
+                return hits if op == '$in' else ~np.isnan(values) & ~hits
+            operand = _to_number(column, operand)
+            if op == '$eq':
+                return values == operand
+            if op == '$ne':
+                return ~np.isnan(values) & (values != operand)
+            if op == '$gt':
+                return values > operand
+            if op == '$gte':
+                return values >= operand
+            if op == '$lt':
+                return values < operand
+            if op == '$lte':
+                return values <= operand
+            raise ValueError(f"Unsupported operator '{op}' for numeric column '{column}'.")
+
+        raise ValueError(f"Unknown filter column '{column}'.")
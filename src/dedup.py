@@ -0,0 +1,85 @@
+# Near-duplicate clustering of image embeddings with random-hyperplane LSH.
+
+import numpy as np
+
+def _find(parent, i):
+    """Union-find root lookup with path halving."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def cluster_near_duplicates(embeddings, threshold=0.95, num_bits=12, num_tables=10, block_size=1024, seed=0):
+    """
+    Group near-identical images by embedding similarity.
+
+    Each hash table buckets the mean-centered vectors by the signs of num_bits random
+    projections, so only vectors sharing a bucket are compared (in blocks) instead of
+    all pairs. Centering matters: SigLIP embeddings share a large mean component, and
+    hyperplanes through the origin would put most vectors on the same side.
+    Pairs with cosine similarity >= threshold are merged transitively.
+
+    Args:
+        embeddings (np.ndarray): L2-normalized embeddings, shape (n, d).
+        threshold (float): Cosine similarity above which two images are duplicates.
+        num_bits (int): Hyperplanes per table; more bits give smaller buckets.
+        num_tables (int): Independent tables; more tables give better duplicate recall.
+        block_size (int): Rows per similarity block inside a bucket.
+        seed (int): Seed for the random hyperplanes.
+
+    Returns:
+        np.ndarray: Cluster ID per row, the lowest row index in its cluster (int64).
+    """
+    n = len(embeddings)
+    parent = np.arange(n)
+    if n < 2:
+        return parent
+
+    rng = np.random.default_rng(seed)
+    weights = 1 << np.arange(num_bits)
+    centered = embeddings - embeddings.mean(axis=0)
+
+    for _ in range(num_tables):
+        planes = rng.normal(size=(embeddings.shape[1], num_bits)).astype(np.float32)
+        signatures = (centered @ planes > 0) @ weights
+
+        order = np.argsort(signatures, kind='stable')
+        boundaries = np.flatnonzero(np.diff(signatures[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            # The threshold is checked on the raw (uncentered) cosine similarity
+            vectors = embeddings[bucket]
+            for start in range(0, len(bucket), block_size):
+                sims = vectors[start:start + block_size] @ vectors.T
+                rows, cols = np.nonzero(sims >= threshold)
+                for r, c in zip(rows + start, cols):
+                    if c <= r:
+                        continue
+                    a, b = _find(parent, bucket[r]), _find(parent, bucket[c])
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+    return np.array([_find(parent, i) for i in range(n)])
+
+def collapse_duplicates(candidates, cluster_of):
+    """
+    Keep only the best candidate per near-duplicate cluster.
+
+    Args:
+        candidates (list): Candidate dicts with an 'id' key, best first.
+        cluster_of (dict): Vector ID -> cluster ID. IDs without a cluster are kept as-is.
+
+    Returns:
+        list: The candidates with later members of an already seen cluster removed.
+    """
+    seen = set()
+    collapsed = []
+    for cand in candidates:
+        cluster = cluster_of.get(cand['id'])
+        if cluster is not None:
+            if cluster in seen:
+                continue
+            seen.add(cluster)
+        collapsed.append(cand)
+    return collapsed
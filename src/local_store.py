@@ -0,0 +1,191 @@
+# Local copy of the ingested embeddings so stored vectors can be reused without re-encoding.
+
+import os
+import json
+import numpy as np
+from src.utils import load_embeddings, save_embeddings
+from src.projection import PCAProjection
+
+class LocalVectorStore:
+    def __init__(self, data_dir, mmap=False):
+        """
+        Initialize the store backed by files in data_dir.
+
+        If data_dir holds a fitted projection (projection.npz), searches run a
+        first pass in the reduced space and re-score the shortlist with full vectors.
+        The reduced vectors are saved next to the projection, so a memory-mapped
+        store never reads the full embeddings at startup.
+
+        Args:
+            data_dir (str): Directory holding embeddings.npy and embedding_ids.json.
+            mmap (bool): Memory-map the full embeddings instead of loading them, so only
+                         re-scored rows are read. Read-only use: do not save() a mapped store.
+        """
+        self.data_dir = data_dir
+        self.embeddings_path = os.path.join(data_dir, 'embeddings.npy')
+        self.ids_path = os.path.join(data_dir, 'embedding_ids.json')
+        self.reduced_path = os.path.join(data_dir, 'reduced_embeddings.npy')
+        self.mmap = mmap
+        self.ids = []
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.projection = None
+        self.reduced = None
+        self._positions = {}
+
+        self.load()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, vector_id):
+        return vector_id in self._positions
+
+    def load(self):
+        """Load embeddings and IDs from disk if both exist."""
+        embeddings = load_embeddings(self.embeddings_path, mmap_mode='r' if self.mmap else None)
+        if embeddings is None or not os.path.exists(self.ids_path):
+            return
+
+        with open(self.ids_path, 'r') as f:
+            ids = json.load(f)
+
+        if len(ids) != len(embeddings):
+            print(f"Warning: {self.ids_path} and {self.embeddings_path} are out of sync, ignoring local store.")
+            return
+
+        self.ids = ids
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self._positions = {vid: i for i, vid in enumerate(self.ids)}
+
+        projection = PCAProjection.load(self.data_dir)
+        reduced = load_embeddings(self.reduced_path)
+        if projection is not None and reduced is not None and reduced.shape == (len(self.ids), projection.dimension):
+            self.projection = projection
+            self.reduced = np.asarray(reduced, dtype=np.float32)
+        else:
+            self.set_projection(projection)
+
+    def set_projection(self, projection):
+        """
+        Use a projection for first-pass search (None to search full vectors only).
+
+        Args:
+            projection (PCAProjection): Fitted projection.
+        """
+        self.projection = projection
+        self.reduced = None
+        if projection is not None and self.ids:
+            self.reduced = projection.transform(self.embeddings)
+
+    def save(self):
+        """Persist embeddings, IDs and (with a projection) the reduced vectors to disk."""
+        save_embeddings(self.embeddings, self.embeddings_path)
+        with open(self.ids_path, 'w') as f:
+            json.dump(self.ids, f)
+        self.save_reduced()
+
+    def save_reduced(self):
+        """Persist the reduced vectors next to the projection."""
+        if self.reduced is not None:
+            save_embeddings(self.reduced, self.reduced_path)
+
+    def add(self, items):
+        """
+        Add or overwrite vectors.
+
+        Args:
+            items (list): List of tuples (id, vector).
+        """
+        new_ids = []
+        new_rows = []
+        updated = []
+        for vector_id, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            if vector_id in self._positions:
+                self.embeddings[self._positions[vector_id]] = vector
+                updated.append(self._positions[vector_id])
+            else:
+                self._positions[vector_id] = len(self.ids) + len(new_ids)
+                new_ids.append(vector_id)
+                new_rows.append(vector)
+
+        if self.projection is not None and updated:
+            # Keep the reduced vectors in sync by projecting only the changed rows
+            self.reduced[updated] = self.projection.transform(self.embeddings[updated])
+
+        if new_rows:
+            rows = np.stack(new_rows)
+            self.embeddings = rows if not self.ids else np.vstack([self.embeddings, rows])
+            self.ids.extend(new_ids)
+            if self.projection is not None:
+                reduced_rows = self.projection.transform(rows)
+                self.reduced = reduced_rows if self.reduced is None else np.vstack([self.reduced, reduced_rows])
+
+    def get(self, vector_id):
+        """
+        Get a stored vector.
+
+        Args:
+            vector_id (str): Vector ID.
+
+        Returns:
+            np.ndarray: The vector, or None if it is not stored locally.
+        """
+        position = self._positions.get(vector_id)
+        if position is None:
+            return None
+        return self.embeddings[position]
+
+    def position(self, vector_id):
+        """Row of vector_id in the embeddings matrix, or None."""
+        return self._positions.get(vector_id)
+
+    def search(self, vector, top_k=5, mask=None, oversample=4, exact=False):
+        """
+        Cosine search over the stored vectors.
+
+        A mask restricts the search to eligible rows before the top-k selection,
+        so the results are always filled with eligible vectors when enough exist.
+        With a projection, the reduced vectors select top_k * oversample candidates
+        which are then re-scored with the full vectors.
+
+        Args:
+            vector (list): Query vector (L2-normalized).
+            top_k (int): Number of results to return.
+            mask (np.ndarray): Optional boolean array, one entry per stored vector.
+            oversample (int): Shortlist size as a multiple of top_k for the first pass.
+            exact (bool): Skip the first pass and score all full vectors.
+
+        Returns:
+            list: List of dicts with 'id' and 'score', best first.
+        """
+        if not self.ids:
+            return []
+
+        vector = np.asarray(vector, dtype=np.float32)
+        use_projection = self.reduced is not None and not exact
+        if use_projection:
+            scores = self.reduced @ self.projection.transform_query(vector)
+        else:
+            scores = self.embeddings @ vector
+
+        eligible = len(scores)
+        if mask is not None:
+            scores[~mask] = -np.inf
+            eligible = int(mask.sum())
+
+        top_k = min(top_k, eligible)
+        if top_k <= 0:
+            return []
+
+        if use_projection:
+            shortlist = min(top_k * oversample, eligible)
+            # Sorted rows keep reads sequential when the full embeddings are memory-mapped
+            rows = np.sort(np.argpartition(-scores, shortlist - 1)[:shortlist])
+            full_scores = self.embeddings[rows] @ vector
+            best = np.argsort(-full_scores)[:top_k]
+            return [{'id': self.ids[rows[i]], 'score': float(full_scores[i])} for i in best]
+
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [{'id': self.ids[i], 'score': float(scores[i])} for i in top]
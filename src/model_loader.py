@@ -53,19 +53,49 @@ class ModelLoader:
         Returns:
             list: The embedding vector as a list of floats.
         """
-        try:
-            image = Image.open(image_path).convert("RGB")
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
+        return self.get_image_embeddings([image_path])[0]
+
+    def get_image_embeddings(self, images, batch_size=16):
+        """
+        Generate embeddings for several images with batched forward passes.
+        
+        Args:
+            images (list): Image file paths, file-like objects or PIL images.
+            batch_size (int): Number of images per forward pass.
             
-            with torch.no_grad():
-                image_features = self.model.get_image_features(**inputs)
+        Returns:
+            list: One embedding (list of floats) per input, None where the image could not be processed.
+        """
+        embeddings = [None] * len(images)
+        
+        for start in range(0, len(images), batch_size):
+            # Decode the batch, skipping unreadable images so one bad file doesn't sink the batch
+            loaded = []
+            for offset, image in enumerate(images[start:start + batch_size]):
+                try:
+                    if not isinstance(image, Image.Image):
+                        image = Image.open(image)
+                    loaded.append((start + offset, image.convert("RGB")))
+                except Exception as e:
+                    print(f"Error processing image {image}: {e}")
+            
+            if not loaded:
+                continue
                 
-            # Normalize the features
-            image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
-            return image_features.cpu().numpy().tolist()[0]
-        except Exception as e:
-            print(f"Error processing image {image_path}: {e}")
-            return None
+            try:
+                inputs = self.processor(images=[img for _, img in loaded], return_tensors="pt").to(self.device)
+                
+                with torch.no_grad():
+                    image_features = self.model.get_image_features(**inputs)
+                    
+                # Normalize the features
+                image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
+                for (idx, _), features in zip(loaded, image_features.cpu().numpy().tolist()):
+                    embeddings[idx] = features
+            except Exception as e:
+                print(f"Error processing image batch starting at {start}: {e}")
+                
+        return embeddings
 
     def get_text_embedding(self, text):
         """
@@ -0,0 +1,251 @@
+# "More like this" search that reuses stored image vectors instead of re-encoding images.
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.utils import vector_values
+from src.dedup import collapse_duplicates
+
+def _match_to_dict(match):
+    """Convert a Pinecone match into a plain dict."""
+    return {
+        'id': match['id'],
+        'score': float(match['score']),
+        'metadata': dict(match['metadata'] or {})
+    }
+
+def corpus_version(ids, cluster_of):
+    """
+    Hash of the vector IDs and their near-duplicate clusters.
+
+    Changes whenever ingest adds vectors or re-clusters them, so caches of search
+    results tagged with it can be recognized as stale.
+
+    Args:
+        ids (list): Vector IDs, in store order.
+        cluster_of (dict): Vector ID -> cluster ID.
+
+    Returns:
+        str: Hex digest.
+    """
+    entries = (f"{vid}:{cluster_of.get(vid, '')}" for vid in ids)
+    return hashlib.md5("\n".join(entries).encode()).hexdigest()
+
+class NeighbourSearch:
+    def __init__(self, indexer, store=None, cache_path=None, cache_size=1024, metadata=None):
+        """
+        Initialize the neighbour search.
+
+        Args:
+            indexer (Indexer): Pinecone indexer used for the vector search.
+            store (LocalVectorStore): Optional local copy of the ingested vectors.
+            cache_path (str): Optional JSON file holding precomputed neighbour lists.
+                              Only used with a store, whose contents version the cache.
+            cache_size (int): Maximum number of neighbour lists kept in memory.
+            metadata (dict): Local metadata keyed by vector ID, attached to pre-filtered local results.
+                             Its 'cluster_id' entries are used to collapse near-duplicates.
+        """
+        self.indexer = indexer
+        self.store = store
+        self.metadata = metadata or {}
+        self.cluster_of = {vid: meta['cluster_id'] for vid, meta in self.metadata.items() if 'cluster_id' in meta}
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_path and os.path.exists(cache_path) and store is not None:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+            # Lists computed before the last ingest would never show the new images
+            if cached.get('version') == self.corpus_version():
+                self._cache.update(cached.get('neighbours', {}))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def corpus_version(self):
+        """Hash of the stored vector IDs and their clusters, changing whenever ingest updates them."""
+        if self.store is None:
+            return None
+        return corpus_version(self.store.ids, self.cluster_of)
+
+    def get_vector(self, vector_id):
+        """
+        Look up the stored embedding of an already indexed image.
+
+        Args:
+            vector_id (str): Vector ID.
+
+        Returns:
+            list: The embedding, or None if the ID is unknown.
+        """
+        if self.store is not None:
+            vector = self.store.get(vector_id)
+            if vector is not None:
+                return vector.tolist()
+
+        fetched = self.indexer.fetch_vectors([vector_id]).get('vectors', {})
+        if vector_id not in fetched:
+            return None
+        return list(vector_values(fetched[vector_id]))
+
+    def search(self, vector, top_k, mask=None):
+        """
+        One vector search over the local store, falling back to Pinecone.
+
+        The local store serves pre-filtered searches, and unfiltered ones too once a
+        projection is fitted (its reduced first pass is cheaper than a Pinecone query).
+        A mask restricts the search before top-k selection, so top_k is filled with
+        eligible images instead of filtering an unfiltered top_k afterwards.
+
+        Returns:
+            list: List of dicts with 'id', 'score' and 'metadata', best first.
+        """
+        use_store = self.store is not None and (mask is not None or self.store.reduced is not None)
+        if use_store:
+            matches = self.store.search(vector, top_k=top_k, mask=mask)
+            for match in matches:
+                match['metadata'] = self.metadata.get(match['id'], {})
+            return matches
+
+        results = self.indexer.search(vector, top_k=top_k)
+        return [_match_to_dict(m) for m in results['matches']]
+
+    def _collapsed_search(self, vector, top_k, mask=None, exclude_id=None, max_rounds=4):
+        """
+        Search and keep one image per near-duplicate cluster, dropping exclude_id and its cluster.
+
+        Collapsing shrinks the result list, so the search is repeated with twice as many
+        results until top_k distinct images are found or the index is exhausted.
+        """
+        exclude_cluster = self.cluster_of.get(exclude_id)
+        fetch_k = 2 * top_k + 1
+        for _ in range(max_rounds):
+            matches = self.search(vector, fetch_k, mask)
+            kept = [m for m in matches if m['id'] != exclude_id
+                    and (exclude_cluster is None or self.cluster_of.get(m['id']) != exclude_cluster)]
+            kept = collapse_duplicates(kept, self.cluster_of)
+            if len(kept) >= top_k or len(matches) < fetch_k:
+                break
+            fetch_k *= 2
+        return kept[:top_k]
+
+    def more_like_this(self, vector_id, top_k=12, mask=None):
+        """
+        Find images similar to an indexed image.
+
+        Costs one lookup and usually one vector search (more only when near-duplicates
+        must be refilled); cached lists cost nothing.
+
+        Args:
+            vector_id (str): ID of the query image.
+            top_k (int): Number of neighbours to return (the image itself is excluded).
+            mask (np.ndarray): Optional pre-filter over the local store rows (bypasses the cache).
+
+        Returns:
+            list: List of dicts with 'id', 'score' and 'metadata', best first.
+        """
+        if mask is None:
+            with self._lock:
+                cached = self._cache.get(vector_id)
+                if cached is not None and len(cached) >= top_k:
+                    self._cache.move_to_end(vector_id)
+                    return cached[:top_k]
+
+        vector = self.get_vector(vector_id)
+        if vector is None:
+            return []
+
+        # The query image and its near-duplicates are excluded, the rest collapsed per cluster
+        neighbours = self._collapsed_search(vector, top_k, mask, exclude_id=vector_id)
+        if mask is not None:
+            return neighbours
+
+        with self._lock:
+            self._cache[vector_id] = neighbours
+            self._cache.move_to_end(vector_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return neighbours
+
+    @staticmethod
+    def encode_images(images, model_loader):
+        """
+        Encode images into one query vector: the normalized mean of their embeddings.
+
+        All images are encoded in batched forward passes.
+
+        Args:
+            images (list): Image file paths, file-like objects or PIL images.
+            model_loader (ModelLoader): Loader used to encode the images.
+
+        Returns:
+            list: The query vector, or None if no image could be encoded.
+        """
+        embeddings = [e for e in model_loader.get_image_embeddings(images) if e is not None]
+        if not embeddings:
+            return None
+
+        query = np.mean(np.asarray(embeddings, dtype=np.float32), axis=0)
+        return (query / np.linalg.norm(query)).tolist()
+
+    def search_by_vector(self, vector, top_k=12, mask=None):
+        """
+        Find images similar to an already encoded query vector.
+
+        Results are collapsed per near-duplicate cluster.
+
+        Args:
+            vector (list): Query vector (L2-normalized).
+            top_k (int): Number of results to return.
+            mask (np.ndarray): Optional pre-filter over the local store rows.
+
+        Returns:
+            list: List of dicts with 'id', 'score' and 'metadata', best first.
+        """
+        return self._collapsed_search(vector, top_k, mask)
+
+    def search_by_images(self, images, model_loader, top_k=12, mask=None):
+        """
+        Find images similar to one or more uploaded images.
+
+        Callers that search the same images repeatedly should cache encode_images()
+        and use search_by_vector() instead.
+
+        Args:
+            images (list): Image file paths, file-like objects or PIL images.
+            model_loader (ModelLoader): Loader used to encode the images.
+            top_k (int): Number of results to return.
+            mask (np.ndarray): Optional pre-filter over the local store rows.
+
+        Returns:
+            list: List of dicts with 'id', 'score' and 'metadata', best first.
+        """
+        query = self.encode_images(images, model_loader)
+        if query is None:
+            return []
+        return self.search_by_vector(query, top_k, mask)
+
+    def precompute(self, vector_ids, top_k=12):
+        """
+        Warm the cache with neighbour lists for the given (e.g. popular) images.
+
+        Args:
+            vector_ids (list): IDs to precompute.
+            top_k (int): Number of neighbours to store per image.
+        """
+        for vector_id in vector_ids:
+            self.more_like_this(vector_id, top_k=top_k)
+
+    def save(self):
+        """Persist the cached neighbour lists to cache_path, tagged with the corpus version."""
+        if not self.cache_path or self.store is None:
+            return
+        with self._lock:
+            snapshot = dict(self._cache)
+        with open(self.cache_path, 'w') as f:
+            json.dump({'version': self.corpus_version(), 'neighbours': snapshot}, f)
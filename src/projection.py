@@ -0,0 +1,89 @@
+# PCA projection of the SigLIP embeddings for a cheaper first-pass similarity search.
+
+import os
+import numpy as np
+
+class PCAProjection:
+    def __init__(self, mean, components):
+        """
+        Initialize the projection. Use fit() or load() rather than calling this directly.
+
+        Args:
+            mean (np.ndarray): Mean embedding, shape (d,).
+            components (np.ndarray): Principal axes, shape (k, d).
+        """
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+
+    @property
+    def dimension(self):
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, embeddings, n_components=256, sample_size=20000, seed=0):
+        """
+        Fit PCA on (a sample of) the ingested embeddings.
+
+        Args:
+            embeddings (np.ndarray): Embedding matrix, shape (n, d).
+            n_components (int): Target dimension.
+            sample_size (int): Maximum number of rows used for the fit.
+            seed (int): Seed for the row sample.
+
+        Returns:
+            PCAProjection: The fitted projection.
+        """
+        if len(embeddings) > sample_size:
+            rows = np.random.default_rng(seed).choice(len(embeddings), sample_size, replace=False)
+            embeddings = embeddings[np.sort(rows)]
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        mean = embeddings.mean(axis=0)
+        _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+        return cls(mean, vt[:n_components])
+
+    @classmethod
+    def load(cls, data_dir):
+        """
+        Load the projection from data_dir/projection.npz.
+
+        Returns:
+            PCAProjection: The projection, or None if none has been fitted.
+        """
+        path = os.path.join(data_dir, 'projection.npz')
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(data['mean'], data['components'])
+
+    def save(self, data_dir):
+        """Persist the projection to data_dir/projection.npz."""
+        np.savez(os.path.join(data_dir, 'projection.npz'), mean=self.mean, components=self.components)
+
+    def transform(self, vectors):
+        """
+        Project corpus vectors into the reduced space.
+
+        Rows are centered but not normalized: since <x, q> = <mean, q> + <x - mean, q>
+        and <mean, q> is the same for every row, transform(x) . transform_query(q)
+        ranks rows like the full cosine, up to the discarded components.
+
+        Args:
+            vectors (np.ndarray): Shape (n, d) or (d,).
+
+        Returns:
+            np.ndarray: Reduced vectors, shape (n, k) or (k,).
+        """
+        return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+
+    def transform_query(self, vector):
+        """
+        Project a query vector into the reduced space (no centering).
+
+        Args:
+            vector (np.ndarray): Shape (d,).
+
+        Returns:
+            np.ndarray: Reduced vector, shape (k,).
+        """
+        return np.asarray(vector, dtype=np.float32) @ self.components.T
@@ -15,16 +15,22 @@ def save_metadata(metadata, metadata_path):
     with open(metadata_path, 'w') as f:
         json.dump(metadata, f, indent=4)
 
-def load_embeddings(embeddings_path):
-    """Load embeddings from NPY file."""
+def load_embeddings(embeddings_path, mmap_mode=None):
+    """Load embeddings from NPY file, optionally memory-mapped."""
     if os.path.exists(embeddings_path):
-        return np.load(embeddings_path, allow_pickle=True)
+        return np.load(embeddings_path, mmap_mode=mmap_mode, allow_pickle=True)
     return None
 
 def save_embeddings(embeddings, embeddings_path):
     """Save embeddings to NPY file."""
     np.save(embeddings_path, embeddings)
 
+def vector_values(vector):
+    """Extract the values of a fetched Pinecone vector (dict or model object)."""
+    if isinstance(vector, dict):
+        return vector.get('values')
+    return vector.values
+
 def get_image_paths(assets_dir):
     """
     Get all image paths from the assets directory.
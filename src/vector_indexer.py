@@ -2,10 +2,57 @@
 
 import os
 import time
+import json
+import random
+import hashlib
+import heapq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
 from pinecone import Pinecone, ServerlessSpec
 
+# Network-level failures worth retrying; the transport library depends on the client version
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError)
+try:
+    import urllib3
+    RETRYABLE_ERRORS += (urllib3.exceptions.HTTPError,)
+except ImportError:
+    pass
+try:
+    import httpx
+    RETRYABLE_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+# Pinecone request limits: 2MB per upsert request and 1000 vectors per upsert
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+MAX_BATCH_VECTORS = 1000
+# Serialized floats take up to ~24 bytes each (digits plus separator) in a JSON request body
+BYTES_PER_VALUE = 24
+
+def _status(error):
+    """HTTP status of a Pinecone error (attribute name differs across client versions)."""
+    return getattr(error, 'status_code', None) or getattr(error, 'status', None)
+
+def _is_payload_too_large(error):
+    """Whether the server rejected a request because of its size."""
+    return _status(error) == 413 or 'request size' in str(error).lower()
+
+def _is_retryable(error):
+    """Transient errors: network failures, rate limiting and server errors."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = _status(error)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+def _field(response, name):
+    """Read a field from a Pinecone response object or a plain dict."""
+    if isinstance(response, dict):
+        return response.get(name)
+    return getattr(response, name)
+
 class Indexer:
-    def __init__(self, index_name="vision-scout", dimension=1152, metric="cosine"):
+    def __init__(self, index_name="vision-scout", dimension=1152, metric="cosine",
+                 max_workers=None, max_retries=5, num_shards=None, index=None):
         """
         Initialize Pinecone Indexer.
         
@@ -13,17 +60,30 @@ class Indexer:
             index_name (str): Name of the index.
             dimension (int): Dimension of the vectors. Default is 1152 for SigLIP so400m.
             metric (str): Metric for similarity search.
+            max_workers (int): Number of concurrent upsert/fetch/query requests.
+                               Defaults to PINECONE_MAX_WORKERS, or 8.
+            max_retries (int): Retries per request on transient errors, with jittered exponential backoff.
+            num_shards (int): Number of namespaces vectors are spread over. 1 keeps everything in the default namespace.
+                              Defaults to PINECONE_NUM_SHARDS, or 1. Every script and the app must agree on it,
+                              so set it in the environment (.env) rather than per call.
+            index: Optional index object to use instead of connecting to Pinecone (e.g. a local stand-in).
         """
+        self.index_name = index_name
+        self.dimension = dimension
+        self.metric = metric
+        self.max_workers = max_workers or int(os.environ.get("PINECONE_MAX_WORKERS", 8))
+        self.max_retries = max_retries
+        self.num_shards = num_shards or int(os.environ.get("PINECONE_NUM_SHARDS", 1))
+        self.index = index
+        
+        if self.index is not None:
+            return
+        
         self.api_key = os.environ.get("PINECONE_API_KEY")
         if not self.api_key:
             raise ValueError("PINECONE_API_KEY environment variable not set.")
         
         self.pc = Pinecone(api_key=self.api_key)
-        self.index_name = index_name
-        self.dimension = dimension
-        self.metric = metric
-        self.index = None
-        
         self._initialize_index()
 
     def _initialize_index(self):
@@ -49,26 +109,112 @@ class Indexer:
             
         self.index = self.pc.Index(self.index_name)
 
+    def namespace(self, vector_id):
+        """Namespace (shard) a vector ID lives in. The default namespace when unsharded."""
+        if self.num_shards <= 1:
+            return ""
+        shard = int(hashlib.md5(vector_id.encode()).hexdigest(), 16) % self.num_shards
+        return f"shard-{shard}"
+
+    def _namespaces(self):
+        return [""] if self.num_shards <= 1 else [f"shard-{i}" for i in range(self.num_shards)]
+
+    def _with_retry(self, request, description):
+        """
+        Run a request, retrying transient errors with full-jitter exponential backoff.
+        
+        Args:
+            request (callable): Zero-argument function issuing the request.
+            description (str): Used in log messages.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return request()
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                print(f"{description} failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    @staticmethod
+    def _batch_id(batch):
+        """Deterministic batch ID derived from the vector IDs, used to label log messages."""
+        return hashlib.md5("\n".join(v[0] for v in batch).encode()).hexdigest()
+
+    @staticmethod
+    def _estimate_bytes(vector):
+        vector_id, values, metadata = vector
+        return len(vector_id) + len(values) * BYTES_PER_VALUE + len(json.dumps(metadata))
+
+    def _make_batches(self, vectors, batch_size):
+        """Group vectors per namespace into batches below both the count and payload limits."""
+        by_namespace = {}
+        for vector in vectors:
+            by_namespace.setdefault(self.namespace(vector[0]), []).append(vector)
+        
+        batches = []
+        for namespace, items in by_namespace.items():
+            batch, batch_bytes = [], 0
+            for vector in items:
+                size = self._estimate_bytes(vector)
+                if batch and (len(batch) >= batch_size or batch_bytes + size > MAX_REQUEST_BYTES):
+                    batches.append((namespace, batch))
+                    batch, batch_bytes = [], 0
+                batch.append(vector)
+                batch_bytes += size
+            if batch:
+                batches.append((namespace, batch))
+        return batches
+
+    def _upsert_batch(self, namespace, batch):
+        """Upsert one batch, halving it if the server still rejects it as too large."""
+        batch_id = self._batch_id(batch)
+        try:
+            self._with_retry(
+                lambda: self.index.upsert(vectors=batch, namespace=namespace),
+                f"Upsert of batch {batch_id[:8]}"
+            )
+        except Exception as e:
+            if not _is_payload_too_large(e) or len(batch) == 1:
+                raise
+            middle = len(batch) // 2
+            self._upsert_batch(namespace, batch[:middle])
+            self._upsert_batch(namespace, batch[middle:])
+
     def upsert_vectors(self, vectors, batch_size=100):
         """
-        Upsert vectors to Pinecone.
+        Upsert vectors to Pinecone concurrently.
+        
+        Batches are capped by batch_size and the request payload limit. Upserts are
+        idempotent per vector ID, so retried or re-sent batches are harmless.
         
         Args:
             vectors (list): List of tuples (id, vector, metadata).
-            batch_size (int): Number of vectors to upsert in a single batch.
+            batch_size (int): Maximum number of vectors to upsert in a single batch.
         """
-        total_vectors = len(vectors)
-        print(f"Upserting {total_vectors} vectors...")
+        batches = self._make_batches(vectors, min(batch_size, MAX_BATCH_VECTORS))
+        failed = []
         
-        for i in range(0, total_vectors, batch_size):
-            batch = vectors[i:i + batch_size]
-            self.index.upsert(vectors=batch)
-            print(f"Upserted batch {i // batch_size + 1}/{(total_vectors + batch_size - 1) // batch_size}")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._upsert_batch, ns, batch): batch for ns, batch in batches}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Upserting", unit="batch", leave=False):
+                try:
+                    future.result()
+                except Exception as e:
+                    batch = futures[future]
+                    print(f"Batch {self._batch_id(batch)[:8]} ({len(batch)} vectors) failed: {e}")
+                    failed.append(batch)
+                    
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(batches)} upsert batches failed after {self.max_retries} retries.")
             
     def search(self, vector, top_k=5):
         """
         Search the Pinecone index.
         
+        With several shards, all namespaces are queried concurrently and the matches merged.
+        
         Args:
             vector (list): Query vector.
             top_k (int): Number of results to return.
@@ -76,19 +222,55 @@ class Indexer:
         Returns:
             dict: Query results.
         """
-        return self.index.query(vector=vector, top_k=top_k, include_metadata=True)
+        if self.num_shards <= 1:
+            return self._with_retry(
+                lambda: self.index.query(vector=vector, top_k=top_k, include_metadata=True),
+                "Query"
+            )
+        
+        def query(namespace):
+            return self._with_retry(
+                lambda: self.index.query(vector=vector, top_k=top_k, include_metadata=True, namespace=namespace),
+                f"Query of {namespace}"
+            )
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            responses = list(pool.map(query, self._namespaces()))
+        matches = [m for response in responses for m in _field(response, 'matches')]
+        return {'matches': heapq.nlargest(top_k, matches, key=lambda m: m['score'])}
 
-    def fetch_vectors(self, ids):
+    def fetch_vectors(self, ids, batch_size=200):
         """
         Fetch vectors by ID to check existence.
         
+        IDs are grouped per namespace and fetched in concurrent batches.
+        
         Args:
             ids (list): List of vector IDs.
+            batch_size (int): Number of IDs per fetch request.
             
         Returns:
-            dict: Dictionary containing the fetched vectors.
+            dict: Dictionary containing the fetched vectors under 'vectors'.
         """
-        return self.index.fetch(ids=ids)
+        by_namespace = {}
+        for vector_id in ids:
+            by_namespace.setdefault(self.namespace(vector_id), []).append(vector_id)
+            
+        fetches = [(ns, group[i:i + batch_size]) for ns, group in by_namespace.items()
+                    for i in range(0, len(group), batch_size)]
+        
+        def fetch(request):
+            namespace, batch = request
+            return self._with_retry(
+                lambda: self.index.fetch(ids=batch, namespace=namespace),
+                f"Fetch of {len(batch)} vectors"
+            )
+        
+        vectors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for response in pool.map(fetch, fetches):
+                vectors.update(_field(response, 'vectors') or {})
+        return {'vectors': vectors}
 
     def delete_index(self):
         """Delete the index."""